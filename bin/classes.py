@@ -1,7 +1,11 @@
 import math
+import numpy as np
+from dataclasses import dataclass
+from functools import reduce
 
 
 class NetworkObject:
+    __slots__ = ('name', 'uid')
 
     def __init__(self, *args, **kwargs) -> None:
         self.name = kwargs['name']
@@ -54,34 +58,42 @@ class McqfSwitchConfiguration(SwitchConfiguration):
         self.priority_groups = priority_groups
 
 
+@dataclass(frozen=True)
 class McqfPriority:
     """A class to store information about a priorty group and its members.
+    Fields are expected to be converted by the caller.
     """
+    # dataclass(slots=True) requires Python 3.10
+    __slots__ = ('priority', 'bandwidth_fraction', 'cycle_coefficient', 'members')
 
-    def __init__(
-        self,
-        priority: int,
-        bandwidth_fraction: float,
-        cycle_coefficient: float,
-        members: list(),
-    ) -> None:
-
-        self.priority = int(priority)
-        self.bandwidth_fraction = float(bandwidth_fraction)
-        self.cycle_coefficient = float(cycle_coefficient)
-        self.members = members
+    priority: int
+    bandwidth_fraction: float
+    cycle_coefficient: float
+    members: tuple
 
-    def __str__(self) -> str:
-        return f"PG#{self.priority}: {self.members} - Bandwidth Factor {self.bandwidth_fraction} & Cycle Coef. {self.cycle_coefficient}"
+    def __getstate__(self):
+        return tuple(getattr(self, f) for f in self.__slots__)
 
-    def __repr__(self) -> str:
-        return self.__str__()
+    def __setstate__(self, state):
+        # Frozen, restored through object.__setattr__ as dataclass(slots=True) does
+        for f, v in zip(self.__slots__, state):
+            object.__setattr__(self, f, v)
 
     def build_default_groups(self):
         """Build groups for unspecified priorities.
         """
 
 
+# Fields of Network.flow_table
+FLOW_TABLE_DTYPE = np.dtype([
+    ('uid', np.int32),
+    ('priority', np.int32),
+    ('period', np.int64),     # us
+    ('deadline', np.int64),   # us
+    ('size_mb', np.float64)   # megabits
+])
+
+
 class Network:
 
     def __init__(
@@ -95,6 +107,12 @@ class Network:
         self.switches = topology['switches']
         self.edges = topology['edges']
 
+        # Flow attributes as a structured array, ordered by flow uid
+        self.flow_table = np.array(
+            sorted((f.uid, f.priority, f.period, f.deadline, f.size) for f in self.flows),
+            dtype=FLOW_TABLE_DTYPE
+        )
+
         self.base_cycle = switch_conf.base_cycle  # Base cycle length in Microseconds
         self.link_speed = switch_conf.link_speed  # Link speed in Megabits (Mbps) per second
 
@@ -102,6 +120,10 @@ class Network:
         self.hypercycle = self.__calc_hypercycle()  # In microseconds
         self.cycles = self.__calc_cycles()          # how many cycles in a hypercycle?
 
+        # Per flow arrays, ordered by flow uid
+        self.flow_periods = np.ascontiguousarray(self.flow_table['period'])
+        self.flow_sizes_mb = np.ascontiguousarray(self.flow_table['size_mb'])
+
         # For MCQF only
         self.switch_conf = switch_conf
 
@@ -112,7 +134,8 @@ class Network:
         Returns:
             _type_: int
         """
-        return math.lcm(*[f.period for f in self.flows])
+        # Flows commonly share periods, only distinct ones are reduced
+        return reduce(math.lcm, {f.period for f in self.flows}, 1)
 
     def __calc_cycles(self):
         """Returns up amount of cycles in a hypercycle.
@@ -125,6 +148,7 @@ class Network:
 
 
 class Flow(NetworkObject):
+    __slots__ = ('source', 'destination', 'priority', 'size_bits', 'size', 'period', 'deadline')
 
     def __init__(self,
                  uid,
@@ -142,36 +166,58 @@ class Flow(NetworkObject):
         self.source = source
         self.destination = destination
         self.priority = priority
-        self.size = int(size) * 8.0e-6  # originally in bytes; to Mb (megabits)
+        self.size_bits = int(size) * 8           # originally in bytes; to bits
+        self.size = self.size_bits / 1_000_000  # to Mb (megabits)
         self.period = period            # originally in us
         self.deadline = deadline        # originally in us
 
         kwargs = {'name': name, 'uid': uid}
         super().__init__(*args, **kwargs)
 
+    @classmethod
+    def from_row(cls, uid, name, source, destination, priority, size, period, deadline):
+        """Build a flow from already converted values, i.e a parsed flow file row.
+        Skips __init__'s keyword plumbing, size is in bytes as in __init__.
+        """
+        flow = cls.__new__(cls)
+        flow.uid = uid
+        flow.name = name
+        flow.source = source
+        flow.destination = destination
+        flow.priority = priority
+        flow.size_bits = size * 8
+        flow.size = flow.size_bits / 1_000_000
+        flow.period = period
+        flow.deadline = deadline
+        return flow
+
     def __str__(self) -> str:
         return f"Flow{self.uid} {self.source}->{self.destination}"
 
 
 class Device(NetworkObject):
+    __slots__ = ('mac', '_ingress', '_egress')
 
     def __init__(self, mac_address, *args, **kwargs) -> None:
         super(Device, self).__init__(*args, **kwargs)
         self.mac = mac_address
-        self._ingress = set()
-        self._egress = set()
+        # Lists while the topology is built, frozen into tuples by finalize()
+        self._ingress = []
+        self._egress = []
 
-    def add_edge(self, edges):
-        """Edges will be either egress or ingress
+    def add_edge(self, edge):
+        """Edge will be either egress or ingress
         """
+        # The source specifies the direction for the edge
+        # If the source is the device itself, this edge is outgoing
+        (self._egress if edge.source is self else self._ingress).append(edge)
 
-        for edge in edges:
-            # The source specifies the direction for the edge
-            # If the source is equals to the device itself, this edge is outgoing
-            if edge.source == self:
-                self._egress.add(edge)
-            else:
-                self._ingress.add(edge)
+    def finalize(self):
+        """Freeze edges once the topology is built.
+        Duplicates are dropped, keeping insertion order.
+        """
+        self._ingress = tuple(dict.fromkeys(self._ingress))
+        self._egress = tuple(dict.fromkeys(self._egress))
 
     def ingress_edges(self):
         """Incoming port.
@@ -187,21 +233,31 @@ class Device(NetworkObject):
 
 
 class EndSystem(Device):
-    pass
+    __slots__ = ()
+    IS_END_SYSTEM = True
 
 
 class Switch(Device):
-    pass
+    __slots__ = ()
+    IS_END_SYSTEM = False
 
 
 class Edge:
+    __slots__ = ('gid', 'uid', 'source', 'destination', 'port')
 
-    def __init__(self, gid, source, destination, port) -> None:
+    def __init__(self, gid, uid, source, destination, port) -> None:
         self.gid = gid       # given id
+        self.uid = uid       # unique identifier, used for hashing
         self.source = source
         self.destination = destination
         self.port = port
 
+    def __hash__(self) -> int:
+        return self.uid
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Edge) and self.uid == other.uid
+
     def __repr__(self) -> str:
         return self.__str__()
 
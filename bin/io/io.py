@@ -2,13 +2,6 @@ import os
 from bin.constants import OUTPUT_FOLDER_NAME
 
 
-def exists(f_name: str):
-    return os.path.exists(f_name)
-
-def create_folder(f_name: str):
-    if not exists(f_name):
-        os.mkdir(f_name)
-
 def write_solution(f_name: str, output: str, append=False):
     """Write solution file
 
@@ -20,8 +13,7 @@ def write_solution(f_name: str, output: str, append=False):
     _o_f = OUTPUT_FOLDER_NAME
     mode = "w" if not append else "a"
 
-    create_folder(_o_f)
+    os.makedirs(_o_f, exist_ok=True)
 
     with open(f"{_o_f}/{f_name}", mode) as f:
         f.write(output)
-        f.close()
\ No newline at end of file
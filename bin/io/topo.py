@@ -1,6 +1,6 @@
-from decimal import Decimal
-import queue
-from re import L
+import os
+import sys
+from functools import lru_cache
 from bin import constants
 from bin.classes import (
     Edge,
@@ -10,12 +10,38 @@ from bin.classes import (
     McqfPriority
 )
 
+# Device class for each vertex type in topology files
+DEVICE_TYPES = {
+    'plc': EndSystem,
+    'switch': Switch
+}
+
+
 def read_file(file_path: str):
-    with open(file_path, 'r') as f:
-        raw_data = f.read().splitlines()
-    
-    # Remove comments
-    return [d for d in raw_data if not d.startswith("#")]
+    """Read an input file, without its comment and blank lines.
+    Reads are memoized by the file's modification time and size, so an unchanged file is only read once.
+    """
+    f_stat = os.stat(file_path)
+    return _read_lines(file_path, f_stat.st_mtime_ns, f_stat.st_size)
+
+
+@lru_cache(maxsize=32)
+def _read_lines(file_path: str, mtime_ns: int, size: int):
+    with open(file_path, 'rb') as f:
+        raw_data = f.read()
+
+    # Remove comments and blank lines in the same pass, only kept lines are decoded
+    # Immutable, as the same result is shared between callers
+    return tuple(d.decode() for d in raw_data.splitlines() if d and d[:1] != b"#")
+
+
+def _dev_port(token: str):
+    """Split a device token into its interned name and port, i.e sw_0_0.P1 -> (sw_0_0, 1)
+    Port defaults to 0 when not given.
+    """
+    name, sep, port = token.partition(".")
+    return sys.intern(name), int(port[1:]) if sep else 0
+
 
 def parse_topo(raw_data: str):
     """Parse topology configuration file.
@@ -26,86 +52,73 @@ def parse_topo(raw_data: str):
     _switches = set()
     # To help control array indexes when building the model
     ctrl_uid = 0
+    edge_uid = 0
+
+    # Bucket lines by their leading token in a single pass
+    # Only the remainder of the line is kept, it gets split once its kind is known
+    _lines = {'vertex': [], 'edge': []}
 
-    # Vertexes
     for r_line in raw_data:
-        p_line = tuple(r_line.split(","))
-        v_id = p_line[0].lower()
-
-        if v_id == 'vertex':
-            _, dtype, name, _, mac, _, _ = p_line
-
-            if dtype.lower() == "plc":
-                device = EndSystem(
-                    name=name,
-                    uid=ctrl_uid,
-                    mac_address=mac
-                )
-            elif dtype.lower() == "switch":
-                device = Switch(
-                    name=name,
-                    uid=ctrl_uid,
-                    mac_address=mac
-                )
-
-            _devices[device.name] = device
-            ctrl_uid += 1
+        l_id, _, rest = r_line.partition(",")
+        bucket = _lines.get(l_id.lower())
+
+        if bucket is not None:
+            bucket.append(rest)
+
+    # Vertexes
+    for rest in _lines['vertex']:
+        dtype, name, _, mac, _, _ = rest.split(",", 5)
+        # Interned, edges look devices up by name
+        device = DEVICE_TYPES[dtype.lower()](
+            name=sys.intern(name),
+            uid=ctrl_uid,
+            mac_address=mac
+        )
+
+        _devices[device.name] = device
+        ctrl_uid += 1
 
     # Edges
-    for r_line in raw_data:
-        p_line = tuple(r_line.split(","))
-        e_id = p_line[0].lower()
-
-        if e_id == 'edge':
-            _, dtype, src, dest, _, g_id = p_line
-
-            # Checking port
-            if "." in src:
-                src, port = src.split(".")
-                port = int(port.replace("P", ""))
-            else:
-                src, port = dest, 0
-
-            if "." in dest:
-                dest, port = dest.split(".")
-                port = int(port.replace("P", ""))
-            else:
-                dest, port = dest, 0
-
-            _scr = _devices[src]
-            _dest = _devices[dest]
-
-            _in_edge = Edge(
-                gid=g_id,
-                source=_scr,
-                destination=_dest,
-                port=port
-            )
+    for rest in _lines['edge']:
+        dtype, src, dest, _, g_id = rest.split(",", 4)
+
+        # The edge's port is given by its destination
+        src, _ = _dev_port(src)
+        dest, port = _dev_port(dest)
+
+        _scr = _devices[src]
+        _dest = _devices[dest]
+
+        # One edge per link, links are full-duplex
+        edge = Edge(
+            gid=g_id,
+            uid=edge_uid,
+            source=_scr,
+            destination=_dest,
+            port=port
+        )
+        edge_uid += 1
 
-            _out_edge = Edge(
-                gid=g_id,
-                source=_dest,
-                destination=_scr,
-                port=port
-            )
+        # Link between devices
+        _scr.add_edge(edge)
+        _dest.add_edge(edge)
 
-            # Link between devices
-            _scr.add_edge([_in_edge, _out_edge])
-            _dest.add_edge([_in_edge, _out_edge])
+        # Adding src list of all devices
+        if _scr.IS_END_SYSTEM:
+            _end_systems.add(_scr)
+        else:
+            _switches.add(_scr)
 
-            # Adding src list of all devices
-            if isinstance(_scr, EndSystem):
-                _end_systems.add(_scr)
-            else:
-                _switches.add(_scr)
+        # Adding destt to list of all devices
+        if _dest.IS_END_SYSTEM:
+            _end_systems.add(_dest)
+        else:
+            _switches.add(_dest)
 
-            # Adding destt to list of all devices
-            if isinstance(_dest, EndSystem):
-                _end_systems.add(_dest)
-            else:
-                _switches.add(_dest)
+        _edges.add(edge)
 
-            _edges.add(_in_edge)
+    for device in _devices.values():
+        device.finalize()
 
     return {
         'switches': _switches,
@@ -117,22 +130,21 @@ def parse_topo(raw_data: str):
 def parse_flows(raw_data: str):
     """Parse flow file.
     """
-
     _flows = set()
 
     for line in raw_data:
-        raw_flow = tuple(line.split(","))
+        raw_flow = line.split(",")
         # flow, priority, id, flowname, type(ISOCHRONOUS_REAL_TIME=TT, AVB_HIGH=AVBA, AVB_LOW=AVBB), source, sink, unused, period, period_unit, deadline, deadline_unit, size(bytes)
         _, priority, gid, fname, _, src, dest, _, period, _, dline, _, size = raw_flow
-        _flow = Flow(
-            uid=int(gid),
-            name=fname,
-            source=src,
-            destination=dest,
-            priority=int(priority), # starts from 1
-            size=int(size),         # bytes
-            period=int(period),     # microseconds
-            deadline=int(dline)     # microseconds
+        _flow = Flow.from_row(
+            int(gid),
+            fname,
+            src,
+            dest,
+            int(priority),  # starts from 1
+            int(size),      # bytes
+            int(period),    # microseconds
+            int(dline)      # microseconds
         )
         _flows.add(_flow)
     return _flows
@@ -147,7 +159,7 @@ def parse_switch_conf(raw_data: str):
     If the amount of queue members does not corespond to constants.MCQF_QUEUE_COUNT (8), the remaining
     queues will be added to the next group.
     """
-    config = {}
+    mcqf_prios = []
 
     # Attributes for non-specific groups
     # Counter to keep track of generated queue #s
@@ -158,23 +170,25 @@ def parse_switch_conf(raw_data: str):
     # gt_cl_f = 0
 
     for line in raw_data:
-        raw_conf = tuple(line.split(","))
         # Priority group,#queues,bandwidth,factor
-        priority, mb_count, bw_fract, cl_factor = raw_conf
-        priority = int(priority)
+        priority, mb_count, bw_fract, cl_factor = line.split(",")
         mb_count = int(mb_count)
-        bw_fract = float(bw_fract)
-        cl_factor = int(cl_factor)
-        members = [q for q in range(q_count, q_count + mb_count)]
-        # Increase member count to next group
-        q_count += len(members)
 
         # In case queues are missing from the given groups
         # acc_bw_f += bw_fract
         # if gt_cl_f < cl_factor:
         #     gt_cl_f = cl_factor
 
-        config[(priority, bw_fract, cl_factor)] = members
+        mcqf_prios.append(
+            McqfPriority(
+                priority=int(priority),
+                bandwidth_fraction=float(bw_fract),
+                cycle_coefficient=float(cl_factor),
+                members=tuple(range(q_count, q_count + mb_count))
+            )
+        )
+        # Increase member count to next group
+        q_count += mb_count
 
     # Create another priority group with remaining queues
     # if genq_count != constants.MCQF_QUEUE_COUNT:
@@ -183,21 +197,7 @@ def parse_switch_conf(raw_data: str):
     #     cl_factor = cl_factor * 2
     #     members = [q for q in range(genq_count, constants.MCQF_QUEUE_COUNT)]
 
-    #     config[(priority, bw_fract, cl_factor)] = members
-
-    mcqf_prios = set()
-
-    for k, memb in config.items():
-        p, bf, cf = k
-
-        mcqf_prios.add(
-            McqfPriority(
-                priority=p,
-                bandwidth_fraction=bf,
-                cycle_coefficient=cf,
-                members=memb
-            )
-        )
+    #     mcqf_prios.append(McqfPriority(priority, bw_fract, cl_factor, members))
 
     return {
         'groups': mcqf_prios,
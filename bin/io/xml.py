@@ -1,4 +1,4 @@
-from xml.dom import minidom
+from xml.etree import ElementTree
 
 from bin.classes import (
     Edge,
@@ -9,55 +9,63 @@ from bin.classes import (
 
 
 def parse_app(file_path: str):
-    xmldoc = minidom.parse(file_path)
-    raw_messages = xmldoc.getElementsByTagName('Message')
     messages = set()
     control_id = 0
 
-    for m in raw_messages:
-        flow = Flow(
-            c_id=control_id,
-            name=m.attributes['Name'].value,
-            source=m.attributes['Source'].value,
-            destination=m.attributes['Destination'].value,
-            size=int(m.attributes['Size'].value),
-            period=int(m.attributes['Period'].value),
-            deadline=int(m.attributes['Deadline'].value),
-        )
-        messages.add(flow)
-        control_id += 1
+    # Streamed, elements are cleared once read
+    for _, el in ElementTree.iterparse(file_path, events=('end',)):
+        if el.tag == 'Message':
+            m = el.attrib
+            flow = Flow(
+                c_id=control_id,
+                name=m['Name'],
+                source=m['Source'],
+                destination=m['Destination'],
+                size=int(m['Size']),
+                period=int(m['Period']),
+                deadline=int(m['Deadline']),
+            )
+            messages.add(flow)
+            control_id += 1
+
+        el.clear()
 
     return messages
 
 
 def parse_conf(file_path: str):
-    xmldoc = minidom.parse(file_path)
-    raw_vertexes = xmldoc.getElementsByTagName('Vertex')  # ESs and SWs
-    raw_edges = xmldoc.getElementsByTagName('Edge')  # Links
+    raw_edges = []  # Links
     _devices = {}
     control_id = 0
 
     end_systems = set()
     switches = set()
 
-    for v in raw_vertexes:
-        _name = v.attributes['Name'].value
+    # ESs and SWs
+    for _, el in ElementTree.iterparse(file_path, events=('end',)):
+        if el.tag == 'Vertex':
+            _name = el.attrib['Name']
 
-        if not _name.startswith("SW"):
-            device = EndSystem(name=v.attributes['Name'].value,
-                               c_id=control_id)
-        else:
-            device = Switch(name=v.attributes['Name'].value, c_id=control_id)
-        _devices[device.name] = device
-        control_id += 1
+            if not _name.startswith("SW"):
+                device = EndSystem(name=_name, c_id=control_id)
+            else:
+                device = Switch(name=_name, c_id=control_id)
+            _devices[device.name] = device
+            control_id += 1
+
+        elif el.tag == 'Edge':
+            # Edges are linked once all devices are known
+            raw_edges.append(dict(el.attrib))
+
+        el.clear()
 
     for e in raw_edges:
-        _scr = _devices[e.attributes['Source'].value]
-        _dest = _devices[e.attributes['Destination'].value]
+        _scr = _devices[e['Source']]
+        _dest = _devices[e['Destination']]
 
-        edge = Edge(id=int(e.attributes['Id'].value),
-                    propDelay=e.attributes['PropDelay'].value,
-                    bandwidth=e.attributes['BW'].value,
+        edge = Edge(id=int(e['Id']),
+                    propDelay=e['PropDelay'],
+                    bandwidth=e['BW'],
                     source=_scr,
                     destination=_dest)
 
@@ -66,15 +74,15 @@ def parse_conf(file_path: str):
         _dest.add_edge(edge)
 
         # Adding src list of all devices
-        if isinstance(_scr, EndSystem):
+        if _scr.IS_END_SYSTEM:
             end_systems.add(_scr)
         else:
             switches.add(_scr)
 
         # Adding destt to list of all devices
-        if isinstance(_dest, EndSystem):
+        if _dest.IS_END_SYSTEM:
             end_systems.add(_dest)
         else:
             switches.add(_dest)
 
-    return {'switches': switches, 'end_systems': end_systems}
\ No newline at end of file
+    return {'switches': switches, 'end_systems': end_systems}
@@ -1,4 +1,4 @@
-import argparse, sys, os, time, platform
+import sys, os, time, platform
 
 from bin.constants import (
     CSQF_QUEUE_COUNT,
@@ -53,10 +53,11 @@ def intro():
     """
     print(Fore.RED + f"{PRESENTATION}" + Style.RESET_ALL)
 
-def parse_args():
+def build_parser():
     """
-    Parse given arguments.
+    Build the argument parser, argparse is only imported when arguments are parsed.
     """
+    import argparse
 
     parser = argparse.ArgumentParser(
         description="Mixed Integer Linear models for CSQF and MCQF traffic schedule in Time-Sensitive Network."
@@ -126,6 +127,13 @@ def parse_args():
         help="Write schedule traffic solution in .CSV files. These files is stored in the <root>/output folder."
     )
 
+    return parser
+
+def parse_args():
+    """
+    Parse given arguments.
+    """
+    parser = build_parser()
     args = parser.parse_args()
 
     if not args.path.endswith('/'):
@@ -1,9 +1,12 @@
+import os
 import sys
 import mosek
+import numpy as np
 from mosek.fusion import (
     Model,
     Domain,
     Expr,
+    Matrix,
     ObjectiveSense,
     OptimizeError,
     SolutionError,
@@ -15,10 +18,7 @@ from colorama import (
     Style
 )
 from bin.constants import OUTPUT_FOLDER_NAME
-from bin.io.io import (
-    write_solution,
-    create_folder
-)
+from bin.io.io import write_solution
 from solvers.classes import (
     TrafficType,
     GenericSolver,
@@ -30,34 +30,53 @@ class Csqf(GenericSolver):
     """A base class for a CSQF Mosek problem instance.
     """
 
-    def __init__(self, *args, **kwargs) -> None:
+    def __init__(self, *args, num_threads=0, presolve_use=None, mio_heuristic_level=None,
+                 mio_tol_rel_gap=None, **kwargs) -> None:
         super().__init__(*args, **kwargs)
 
         # MODEL
         self._model = Model()
+        # Constraints and objective are posted on the first solve only
+        self._built = False
+
+        # Solver parameters, None keeps MOSEK's default
+        self._solver_params = {
+            "numThreads": num_threads,  # 0 = all available cores
+            "presolveUse": presolve_use,
+            "mioHeuristicLevel": mio_heuristic_level,
+            "mioTolRelGap": mio_tol_rel_gap,
+        }
 
         # Data
         self._switches = self.network.switches
         self._endsys = self.network.end_systems
-        self._flows = self.network.flows
+        self._flows = tuple(sorted(self.network.flows, key=lambda f: f.uid))
         self._link_speed = self.network.link_speed
         self._base_cycle = self.network.base_cycle
         self._edges = self.network.edges
 
         # Labels & identification
-        self._dev_labels = {dev.uid: dev.name for dev in set.union(self._switches, self._endsys)}
-        self._dev_uids = {dev.name: dev.uid for dev in set.union(self._switches, self._endsys)}
+        _all_devs = self._switches | self._endsys
+        self._dev_labels = {dev.uid: dev.name for dev in _all_devs}
+        self._dev_uids = {dev.name: dev.uid for dev in _all_devs}
 
         self._edg_gids = {(edg.source.uid, edg.destination.uid): edg.gid for edg in self._edges}
         # adding reverse order, as edges are duplex
         self._edg_gids.update({(edg.destination.uid, edg.source.uid): edg.gid for edg in self._edges})
 
+        # Directed links (d, e), both directions of every edge
+        # Only existing links get r and b variables
+        self._links = sorted(self._edg_gids)
+        self._link_pos = {link: i for i, link in enumerate(self._links)}
+        self._link_gids = [self._edg_gids[link] for link in self._links]
+
         # Sizes
         self._queue_count = self.network.switch_conf.queue_count
         self._flow_count = len(self._flows)
         self._device_count = len(self._switches) + len(self._endsys)
         self._cycle_count = self.network.cycles
         self._edge_count = len(self._edges)
+        self._link_count = len(self._links)
 
         # Iterators
         self._flow_iter = range(0, self._flow_count)
@@ -65,72 +84,138 @@ class Csqf(GenericSolver):
         self._dev_iter = range(0, self._device_count)
         self._cycle_iter = range(0, self._cycle_count)
 
-        # Extracted attributes
-        self._flow_dls = {flow.uid: flow.deadline for flow in self._flows}
+        # Positions of the links leaving/entering each device
+        self._out_links = {d: [] for d in self._dev_iter}
+        self._in_links = {d: [] for d in self._dev_iter}
+        for k, (d, e) in enumerate(self._links):
+            self._out_links[d].append(k)
+            self._in_links[e].append(k)
+
+        # Extracted attributes, per flow arrays ordered by flow uid
+        self._flow_sizes = self.network.flow_sizes_mb
+        self._flow_periods = self.network.flow_periods
+        # Deadlines keep the flow table's dtype, converted to float for Fusion where used
+        self._flow_dls = self.network.flow_table['deadline']
+        self._flow_prios = self.network.flow_table['priority']
+        # Source and destination device uids, -1 for devices missing from the topology
+        self._flow_src = np.array([self._dev_uids.get(f.source, -1) for f in self._flows], dtype=np.int32)
+        self._flow_dest = np.array([self._dev_uids.get(f.destination, -1) for f in self._flows], dtype=np.int32)
+
+        # Queue attributes, before r's domain depends on them
+        self._init_queues()
 
         # Solver variables
 
-        # Links
+        # Links, r[f, q, l] for the directed link self._links[l]
         self._r_vars = self._model.variable(
             "r",
-            [self._flow_count, self._queue_count, self._device_count, self._device_count],
-            Domain.binary()
+            [self._flow_count, self._queue_count, self._link_count],
+            self._r_domain()
         )
 
         # Aux. var, bw util == Sum(s.ci * Bijc)
+        # One entry per directed link, ordered as self._links
         self._b_vars = self._model.variable(
             "b",
-            [self._device_count, self._device_count],
+            [self._link_count],
             Domain.greaterThan(0.0)
         )
 
-    def _calc_arrival_pattern(self, cycle, flow):
-        """Arrival Pattern function Alpha(c).
+    def _init_queues(self):
+        """Queue attributes, CSQF queues are only identified by their number.
         """
-        return flow.size if 0 <= (cycle * self._base_cycle % flow.period) <= self._base_cycle else 0
+        pass
 
-    def _cons_non_edges(self):
-        """Since not all devices are connected to each other,
-        constrain non-existing edges in the graph to zero.
+    def _r_domain(self):
+        """Domain of the path variables r, binary for CSQF.
+
+        Returns:
+            Domain: domain of r[f, q, l]
+        """
+        return Domain.binary()
+
+    def _r_flow_sums(self, links):
+        """Sum of r for every flow, over all queues and the given links.
+
+        Args:
+            links (list): link positions
+
+        Returns:
+            Expression: one entry per flow, ordered by flow uid
         """
+        _vars = self._r_vars.pick(
+            [[f, q, k] for f in self._flow_iter for q in self._queue_iter for k in links]
+        )
+        return Expr.sum(Expr.reshape(_vars, [self._flow_count, self._queue_count * len(links)]), 1)
+
+    def _r_flow_dots(self, coef):
+        """Weighted sum of r for every flow, over all queues and links.
+
+        Args:
+            coef (np.ndarray): weights of r[f, q, l], shared by all flows and ordered as (q, l)
+
+        Returns:
+            Expression: one entry per flow, ordered by flow uid
+        """
+        _qls = self._queue_count * self._link_count
+        return Expr.flatten(
+            Expr.mul(
+                Expr.reshape(self._r_vars, [self._flow_count, _qls]),
+                Matrix.dense(_qls, 1, coef)
+            )
+        )
+
+    def _arrival_patterns(self, cycles):
+        """Arrival Pattern function Alpha(c), for all flows at once.
 
-        # All edges, permutated
-        # Since connections are duplex, permutate connections, where (1,0) == (0,1)
-        _ea_edges = set()
-
-        for edge in self._edges:
-            edg = (edge.source.uid, edge.destination.uid)
-            # Permutating, since edges are full-duplex
-            _ea_edges.add((edg[0], edg[1]))
-            _ea_edges.add((edg[1], edg[0]))
-
-        # Control list
-        _c_edges = set()
-
-        for d in self._dev_iter:
-            for e in self._dev_iter:
-                i, o = edge = (d, e)
-
-                # Edge does not exist and is not in control list
-                if edge not in _ea_edges and edge not in _c_edges:
-                    self._model.constraint(
-                        f"Non-existing edge r{i}->{o}",
-                        Expr.sum(
-                            self._r_vars.slice(
-                                [0, 0, i, o],
-                                [self._flow_count, self._queue_count, i + 1, o + 1]
-                        )),
-                        Domain.equalsTo(0.0))
-
-                    self._model.constraint(
-                        f"Non-existing edge b{i}->{o}",
-                        Expr.sum(
-                            self._b_vars.slice(
-                                [i, o],
-                                [i + 1, o + 1]
-                        )),
-                        Domain.equalsTo(0.0))
-                    _c_edges.add(edge)
+        Args:
+            cycles (np.ndarray): the cycles c to evaluate, any shape
+
+        Returns:
+            np.ndarray: A(c) of every flow, shaped cycles.shape + (flows,)
+        """
+        _offset = cycles[..., np.newaxis] * self._base_cycle % self._flow_periods
+        return np.where((0 <= _offset) & (_offset <= self._base_cycle), self._flow_sizes, 0.0)
+
+    def _arrival_tensor(self, cycles):
+        """Arrival patterns over a grid of cycles, through a lookup table.
+        A(c) is evaluated once per distinct cycle in the grid, as a [cycle, flow] table,
+        and gathered back into the grid's shape.
+
+        Args:
+            cycles (np.ndarray): the cycles c to evaluate, any shape
+
+        Returns:
+            np.ndarray: A(c) of every flow, shaped cycles.shape + (flows,)
+        """
+        _keys, _inverse = np.unique(cycles, return_inverse=True)
+        _lut = self._arrival_patterns(_keys)
+
+        return _lut[_inverse.reshape(cycles.shape)]
+
+    def _link_load_matrix(self, alpha, queues):
+        """Arrival pattern coefficients of every link and cycle, over the flattened r.
+        Row (l, c) holds A(c - α) for every flow in the given queues of link l.
+
+        Args:
+            alpha (np.ndarray): A(c - α) as [cycle, flow, queue], for the given queues
+            queues (list): the queues covered by alpha
+
+        Returns:
+            Matrix: a sparse [link * cycle, flow * queue * link] matrix
+        """
+        _qc, _lc, _cc = self._queue_count, self._link_count, self._cycle_count
+        _c, _f, _i = np.nonzero(alpha)
+        _links = np.arange(_lc)[:, np.newaxis]
+
+        rows = (_links * _cc + _c).ravel()
+        cols = ((_f * _qc + np.asarray(queues)[_i]) * _lc + _links).ravel()
+        vals = np.tile(alpha[_c, _f, _i], _lc)
+
+        return Matrix.sparse(
+            _lc * _cc, self._flow_count * _qc * _lc,
+            rows.astype(np.int32), cols.astype(np.int32), vals
+        )
 
     def _cons_src_dest(self):
         """Constrain sources and destinations
@@ -138,71 +223,42 @@ class Csqf(GenericSolver):
         r[i, *, *, *] == 0
         """
 
-        for flow in self._flows:
-            for esys in self._endsys:
-                _is_src = flow.source == esys.name
-                _is_dest = flow.destination == esys.name
-                _src_vars = self._r_vars.slice(
-                    [flow.uid, 0, esys.uid, 0],
-                    [flow.uid + 1, self._queue_count, esys.uid + 1, self._device_count]
-                )
-                _dest_vars = self._r_vars.slice(
-                    [flow.uid, 0, 0, esys.uid],
-                    [flow.uid + 1, self._queue_count, self._device_count, esys.uid + 1]
-                )
-
-                # Neither src or dst
-                _dest_val = 0.0
-                _src_val = 0.0
+        _endsys = list(self._endsys)
+        _es_uids = np.array([esys.uid for esys in _endsys], dtype=np.int32)
 
-                # Source vertex?
-                if _is_src:
-                    _src_val = 1.0
+        # Source/dest. vertex? as [flow, endsys] 0/1 matrices, rows ordered by flow uid
+        _is_src = (self._flow_src[:, np.newaxis] == _es_uids).astype(np.float64)
+        _is_dest = (self._flow_dest[:, np.newaxis] == _es_uids).astype(np.float64)
 
-                # Dest. vertex?
-                if _is_dest:
-                    _dest_val = 1.0
-
-                # Const. streams leaving node
-                self._model.constraint(
-                    f"Endsys. {esys.name} source for {flow.name}",
-                    Expr.sum(_src_vars),
-                    Domain.equalsTo(_src_val)
-                )
+        for j, esys in enumerate(_endsys):
+            # Const. streams leaving node
+            self._model.constraint(
+                f"Endsys. {esys.name} source",
+                self._r_flow_sums(self._out_links[esys.uid]),
+                Domain.equalsTo(_is_src[:, j])
+            )
 
-                # Const. streams leaving node
-                self._model.constraint(
-                    f"Endsys. {esys.name} destination for {flow.name}",
-                    Expr.sum(_dest_vars),
-                    Domain.equalsTo(_dest_val)
-                )
+            # Const. streams entering node
+            self._model.constraint(
+                f"Endsys. {esys.name} destination",
+                self._r_flow_sums(self._in_links[esys.uid]),
+                Domain.equalsTo(_is_dest[:, j])
+            )
 
     def _cons_switch_traffic(self):
         """Constrain switch traffic, s.t sum(in_flows) == sum(out_flows)
         """
         # SWITCHES
         for switch in self._switches:
-            for m in self._flow_iter:
-                # Ingoing edges
-                _ini_var = self._r_vars.slice(
-                    [m, 0, 0, switch.uid],
-                    [m + 1, self._queue_count, self._device_count, switch.uid + 1],
-                )
-                # Outgoing edges
-                _ino_var = self._r_vars.slice(
-                    [m, 0, switch.uid, 0],
-                    [m + 1, self._queue_count, switch.uid + 1, self._device_count],
-                )
-
-                # Flows entering must leave
-                self._model.constraint(
-                    f"Switch traffic sum(*->{switch.name}) = sum({switch.name}->*) for flow {m}",
-                    Expr.sub(
-                        Expr.sum(_ini_var),
-                        Expr.sum(_ino_var)
-                    ),
-                    Domain.equalsTo(0.0)
-                )
+            # Flows entering must leave, for every flow
+            self._model.constraint(
+                f"Switch traffic sum(*->{switch.name}) = sum({switch.name}->*)",
+                Expr.sub(
+                    self._r_flow_sums(self._in_links[switch.uid]),
+                    self._r_flow_sums(self._out_links[switch.uid])
+                ),
+                Domain.equalsTo(0.0)
+            )
 
     def _cons_aux_vars(self):
         """Constrain aux. variables
@@ -210,56 +266,43 @@ class Csqf(GenericSolver):
         B is assigned the sum (s.b * r_ij + ..)
         BUji = Sum(Rij)
         """
-        for d in self._dev_iter:
-            for e in self._dev_iter:
-                _deb_vars = []
-
-                for f in self._flows:
-                    _b_var = self._r_vars.slice(
-                        [f.uid, 0, d, e],
-                        [f.uid + 1, self._queue_count, d + 1, e + 1]
-                    )
-                    # Bw util.
-                    _deb_vars.append(Expr.mul(f.size, _b_var))
-
-                # Aux. var. for bandwidth util. calculation
-                self._model.constraint(
-                    f"b{d}<->{e} = sum(s.Alpha * rs{d}<->{e} + ...)",
-                    Expr.sub(
-                        self._b_vars.index(d, e),
-                        Expr.sum(Expr.vstack(_deb_vars))
-                    ),
-                    Domain.equalsTo(0.0)
+        # Flow sizes, repeated for every queue, ordered as r[:, :, l]
+        _sizes = np.repeat(self._flow_sizes, self._queue_count)
+
+        for k, (d, e) in enumerate(self._links):
+            _s_vars = Expr.flatten(
+                self._r_vars.slice(
+                    [0, 0, k],
+                    [self._flow_count, self._queue_count, k + 1]
                 )
+            )
+
+            # Aux. var. for bandwidth util. calculation
+            self._model.constraint(
+                f"b{d}<->{e} = sum(s.Alpha * rs{d}<->{e} + ...)",
+                Expr.sub(
+                    self._b_vars.index(k),
+                    Expr.dot(_sizes, _s_vars)
+                ),
+                Domain.equalsTo(0.0)
+            )
 
     def _cons_bandwidth(self):
         """Cosntrain link bandwidth utilization
         Calculate bandwidth utilization by summing flows that are being transmitted in the same cycle.
         """
-        for d in self._dev_iter:
-            for e in self._dev_iter:
-                for c in self._cycle_iter:
-                    _realc = c + 1
-                    _s_vars = []
-
-                    for q in self._queue_iter:
-                        # for A(c - α)
-                        alpha = q + 1
-
-                        for f in self._flows:
-                            _s_a = self._calc_arrival_pattern(_realc - alpha, f)
-                            _s_var = Expr.mul(
-                                _s_a, # arrival pattern
-                                self._r_vars.index([f.uid, q, d, e])
-                            )
-                            _s_vars.append(_s_var)
-
-                    # Link utilization constraint
-                    self._model.constraint(
-                        f"Link capacity edge e{d}<->e{e} cycle {_realc}",
-                        Expr.sum(Expr.vstack(_s_vars)),
-                        Domain.lessThan(self._link_speed)
-                    )
+        # Arrival patterns do not depend on the edge, computed once
+        # alpha[c, f, q]: A(c - α) of flow f in queue q
+        _realc = np.arange(1, self._cycle_count + 1)
+        _alpha = np.arange(1, self._queue_count + 1)
+        alpha = self._arrival_tensor(_realc[:, np.newaxis] - _alpha).transpose(0, 2, 1)
+
+        # Link utilization constraint, for every link and cycle, built once over the flattened r
+        self._model.constraint(
+            "Link capacity",
+            Expr.mul(self._link_load_matrix(alpha, self._queue_iter), Expr.flatten(self._r_vars)),
+            Domain.lessThan(self._link_speed)
+        )
 
     def _cons_deadline(self):
         """Constrain deadline
@@ -267,30 +310,19 @@ class Csqf(GenericSolver):
         The solution domain is restricted to feasible solutions where flows meet their deadlines.
         """
 
-        for m in self._flow_iter:
-            _md_vars = []
-            for q in self._queue_iter:
-                # Domain transf.: for all flows, multiply the queue# by the cycle length.
-                # REMEMBER: queue # start from 0
-
-                # Note: queue coefficient delay == queue #
-                _qf = (q + 1) * self._base_cycle
-                for d in self._dev_iter:
-                    _md_vars.append(
-                        Expr.mul(
-                            _qf,
-                            self._r_vars.slice(
-                                [m, q, d, 0],
-                                [m + 1, q + 1, d + 1, self._device_count]
-                            )
-                        )
-                    )
+        # Domain transf.: for all flows, multiply the queue# by the cycle length.
+        # REMEMBER: queue # start from 0
+        # Note: queue coefficient delay == queue #
+        _qf = np.repeat(
+            np.arange(1, self._queue_count + 1, dtype=np.float64) * self._base_cycle,
+            self._link_count
+        )
 
-            self._model.constraint(
-                f"Deadline constraint for flow {m}",
-                Expr.sum(Expr.vstack(_md_vars)),
-                Domain.lessThan(self._flow_dls[m])
-            )
+        self._model.constraint(
+            "Deadline constraint",
+            self._r_flow_dots(_qf),
+            Domain.lessThan(self._flow_dls.astype(np.float64))
+        )
 
     def _obj_bandwidth_util(self):
         """
@@ -298,47 +330,23 @@ class Csqf(GenericSolver):
         Given by: 
             sum(Bijc) / |E|, for e,j in |D| and c in |C|
         """
-        obj_mband = []
-
-        for d in self._dev_iter:
-            for e in self._dev_iter:
-                _bmax_vars = self._b_vars.index([d, e])
-                # (Max(Bijc) / link capacity) * 1000
-                obj_mband.append(
-                    Expr.mul(
-                        1000,
-                        Expr.mul(
-                            1/self._link_speed,
-                            Expr.sum(_bmax_vars)
-                        )
-                    )
-                )
+        # (Max(Bijc) / link capacity) * 1000
+        obj_mband = Expr.mul(1000 / self._link_speed, Expr.sum(self._b_vars))
 
         # |E| = Set of links
         e_count = len(self._edges)
 
         # sum(Bij) / |E|
-        return Expr.mul(1/e_count, Expr.sum(Expr.vstack(obj_mband)))
+        return Expr.mul(1/e_count, obj_mband)
 
     def _obj_mean_e2e(self):
-        e2e = []
-        # Queue delay coefficients
-        _q_cf = [(q + 1) * self._base_cycle for q in self._queue_iter]
-
-        for q in self._queue_iter:
-            e2e.append(
-                Expr.mul(
-                    _q_cf[q],
-                    self._r_vars.slice(
-                        [0, q, 0, 0],
-                        [self._flow_count, q + 1, self._device_count, self._device_count],
-                    )
-                )
-            )
+        # Queue delay coefficients, for every r[f, q, l]
+        _q_cf = np.arange(1, self._queue_count + 1, dtype=np.float64) * self._base_cycle
+        _coef = np.tile(np.repeat(_q_cf, self._link_count), self._flow_count)
 
         return Expr.mul(
             1/self._flow_count,
-            Expr.sum(Expr.vstack(e2e))
+            Expr.dot(_coef, Expr.flatten(self._r_vars))
         )
 
 
@@ -351,7 +359,6 @@ class Csqf(GenericSolver):
         self._cons_bandwidth()
         self._cons_aux_vars()
         # self._cons_deadline()
-        self._cons_non_edges()
 
     def _build_obj_func(self, *args):
         """Build objective function.
@@ -372,19 +379,26 @@ class Csqf(GenericSolver):
         """
         sol_args = (write_tt, write_out)
 
-        self._gen_constraints()
+        # Later calls re-optimize the same model, e.g. after a parameter update
+        if not self._built:
+            self._gen_constraints()
 
-        obj_name, obj_func = self._build_obj_func()
+            obj_name, obj_func = self._build_obj_func()
 
-        self._model.objective(
-            obj_name,
-            ObjectiveSense.Minimize,
-            obj_func
-        )
+            self._model.objective(
+                obj_name,
+                ObjectiveSense.Minimize,
+                obj_func
+            )
+            self._built = True
 
         if verbose:
             self._model.setLogHandler(sys.stdout)
 
+        for param, value in self._solver_params.items():
+            if value is not None:
+                self._model.setSolverParam(param, value)
+
         print(Fore.YELLOW + "\nOptimizing..." + Style.RESET_ALL)
         self._model.solve()
         self._model.acceptedSolutionStatus(AccSolutionStatus.Optimal)
@@ -404,7 +418,7 @@ class Csqf(GenericSolver):
 
         if write_tt:
             print(Fore.BLUE + "Writing model to task files..." + Style.RESET_ALL)
-            create_folder(OUTPUT_FOLDER_NAME)
+            os.makedirs(OUTPUT_FOLDER_NAME, exist_ok=True)
 
             self._model.writeTask(f"{OUTPUT_FOLDER_NAME}/{self._output_name}.ptf")
             self._model.writeTask(f"{OUTPUT_FOLDER_NAME}/{self._output_name}.opf")
@@ -457,36 +471,40 @@ class Csqf(GenericSolver):
             print(Fore.RED + f"Unexpected error: {e}" + Style.RESET_ALL)
             raise e
 
-    def __sort_result(self, flow, dom):
+    def __sort_result(self, pos, dom):
         """Sort the path solution for the given flow
 
         Args:
-            flow (_type_): the flow
+            pos (int): the flow's position, in flow uid order
             dom (_type_): the path solution for the flow
 
         Returns:
             _type_: A list of tuple, representing the edge coordinates and bandwidth for every edge
         """
-        n = self._dev_uids
-        _src = n[flow.source]
-        _dest = n[flow.destination]
-        nxt = _src
+        _src = int(self._flow_src[pos])
+        _dest = int(self._flow_dest[pos])
         srt_path = []
 
-        # aviod inf.
-        _scr_count = 0
+        # Successors of each device, in solution order
+        succ = {}
+        for r in dom:
+            succ.setdefault(r[2], []).append(r)
+
+        nxt = _src
+        visited = {_src}
 
         while nxt != _dest:
-            for r in dom:
-                if nxt == r[2]:
-                    nxt = r[3]
-                    srt_path.append(r)
-                    _scr_count = 0
-                else:
-                    _scr_count += 1
-
-            if _scr_count > len(dom):
+            if not succ.get(nxt):
+                raise Exception("Solution found, but could not construct flow's path.")
+
+            r = succ[nxt].pop(0)
+            srt_path.append(r)
+            nxt = r[3]
+
+            # aviod inf.
+            if nxt in visited:
                 raise Exception("Solution found, but could not construct flow's path.")
+            visited.add(nxt)
 
         return srt_path
 
@@ -498,33 +516,33 @@ class Csqf(GenericSolver):
             b_sol (list): the solver's solution for bandwidth variables
         """
 
-        r_sol = []
+        # Selected links of every flow, by the flow's position in uid order
+        r_sol = {m: [] for m in self._flow_iter}
         # Bandwidth utilization: e#: (bandwidth, streams transmitted count)
         b_sol = {edg: (0, 0) for _, edg in self._edg_gids.items()}
         accounted = set() # accounted edges, avoid adding the same edge value data twice
         solution = Solution()
 
-        # Extract vars. values from solver
-        for m in self._flow_iter:
-            for q in self._queue_iter:
-                for d in self._dev_iter:
-                    for e in self._dev_iter:
-                        _r_pos = [m, q, d, e]
-                        _rval = self._r_vars.index(_r_pos).level()
-                        _bval = self._b_vars.index(d, e).level()
-
-                        if _rval > 1e-4:
-                            r_sol.append(_r_pos)
-                            # key is edge and value is bandwidth util.
-                            edge = self._edg_gids[(d, e)]
-
-                            # Avoid duplicates
-                            if edge not in accounted:
-                                bandwidth, t_count = b_sol[edge]
-                                t_count += 1
-                                bandwidth += _bval[0]
-                                b_sol[edge] = (bandwidth, t_count)
-                                accounted.add(edge)
+        # Extract vars. values from solver, all at once
+        _r_levels = np.asarray(self._r_vars.level()).reshape(
+            self._flow_count, self._queue_count, self._link_count
+        )
+        _b_levels = self._b_vars.level()
+
+        # Selected links, ordered by [m, q, d, e]
+        for m, q, k in np.argwhere(_r_levels > 1e-4).tolist():
+            d, e = self._links[k]
+            r_sol[m].append([m, q, d, e])
+            # key is edge and value is bandwidth util.
+            edge = self._link_gids[k]
+
+            # Avoid duplicates
+            if edge not in accounted:
+                bandwidth, t_count = b_sol[edge]
+                t_count += 1
+                bandwidth += _b_levels[k]
+                b_sol[edge] = (bandwidth, t_count)
+                accounted.add(edge)
 
         dl = self._dev_labels
 
@@ -533,19 +551,21 @@ class Csqf(GenericSolver):
         # TCFileame-TrafficShaper-Algorithm-Flows.csv
         _flow_f_name = f"{self._output_name}-IP-Flows.csv"
         # File header
-        _flow_out = "FlowName,MaxE2E(us),Deadline(us),Path(SourceName|LinkID|priorityGroup|QNumber\n"
+        _flow_out = ["FlowName,MaxE2E(us),Deadline(us),Path(SourceName|LinkID|priorityGroup|QNumber\n"]
+
+        is_csqf = self._traffic_type == TrafficType.CSQF.name
 
         # Construct flow path for all flows
-        for m in self._flows:
+        for pos, (m, f_deadline) in enumerate(zip(self._flows, self._flow_dls.tolist())):
             # all values for this flow
-            _r = [s for s in r_sol if s[0] == m.uid]
-            r_srtd = self.__sort_result(m, _r)
+            _r = r_sol[pos]
+            r_srtd = self.__sort_result(pos, _r)
 
             f_name = m.name
-            f_deadline = m.deadline
-            p_path = ""
+            p_path = []
             max_e2e = 0
             r_path = []  # path in tuples
+            tf = 1 if is_csqf else m.priority
 
             # Flow's traveled path
             for r in r_srtd:
@@ -557,22 +577,22 @@ class Csqf(GenericSolver):
 
                 # Edge ID
                 e_name = self._edg_gids[(isrc, idst)]
-                tf = 1 if self._traffic_type == TrafficType.CSQF.name else m.priority
                 max_e2e += q * self._base_cycle
 
                 # output string
                 # queue # is 1-indexed
                 r_path.append((src, e_name, tf, q))
-                p_path += f"{src}|{e_name}|{tf}|{q}-"
+                p_path.append(f"{src}|{e_name}|{tf}|{q}")
 
-            p_path += f"{dst}"
-            _flow_out += f"{m.name}, {max_e2e}, {f_deadline}, {p_path}\n"
+            p_path.append(f"{dst}")
+            p_path = "-".join(p_path)
+            _flow_out.append(f"{m.name}, {max_e2e}, {f_deadline}, {p_path}\n")
             solution.add_flow({f_name: (max_e2e, f_deadline, p_path, r_path)})
 
         # TCFileame-TrafficShaper-Algorithm-Topo.csv
         _topo_f_name = f"{self._output_name}-IP-Topo.csv"
         # File Header
-        _topo_out = "EdgeID,maxBW(Kbps),MeanBW(Kbps),MeanLU(%)\n"
+        _topo_out = ["EdgeID,maxBW(Kbps),MeanBW(Kbps),MeanLU(%)\n"]
 
         # BW is the aux. var. for bandwidth util.
         for edge, data in b_sol.items():
@@ -583,9 +603,12 @@ class Csqf(GenericSolver):
             mean_bw = bw_mb / t_count / self._link_speed if t_count else 0
             mean_util = bw_mb / t_count / self._link_speed * 100 if t_count else 0
 
-            _topo_out += f"{edge}, {max_bw}, {mean_bw}, {mean_util}%\n"
+            _topo_out.append(f"{edge}, {max_bw}, {mean_bw}, {mean_util}%\n")
             solution.add_edge({edge: (max_bw, mean_bw, mean_util)})
 
+        _flow_out = "".join(_flow_out)
+        _topo_out = "".join(_topo_out)
+
         print("\n# Solution #\n")
         print(_flow_out)
         print(_topo_out)
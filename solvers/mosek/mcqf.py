@@ -1,4 +1,5 @@
 from math import prod
+import numpy as np
 from bin.constants import OUTPUT_FOLDER_NAME
 from solvers.classes import TrafficType
 from solvers.mosek.csqf import Csqf
@@ -19,113 +20,144 @@ class MultiCqf(Csqf):
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
 
+        # Flow deadlines as a model parameter, created with the deadline constraint
+        self._dl_param = None
+        self._dl_cons = None
+
+        # Priority groups in ascending priority, as rows/columns of the report
+        _pgs = list(dict.fromkeys(sorted(pg.priority for pg in self._qp_groups)))
+        # Report row of every priority group
+        self._pg_rows = {pg: i for i, pg in enumerate(_pgs)}
+
+        # Report header, with per group columns
+        _pg_mean_delay, _pg_maxbwc, _pg_meanbwc, _pg_missed = (
+            ",".join(f"{pg}-{col}" for pg in _pgs) for col in ("E2E", "MaxBWC", "MeanBWC", "missed")
+        )
+        self._report_header = f"\nTCFileName, TrafficShaper, Algorithm, Runtime(s), MeanE2E(us), {_pg_mean_delay}, MeanLU (%), MaxLU (%), MeanBWC(%), MaxBWC(%), {_pg_maxbwc}, {_pg_meanbwc}, NoofmissedDeadlines, {_pg_missed}\n"
+
+    def _init_queues(self):
+        """Queue attributes from the switch configuration's priority groups
+        """
         # Queue priority groups
         self._qp_groups = self.network.switch_conf.priority_groups
-        # A direct mapping between queues and their cycle coefficient Q.a
-        self._q_cf = {q: pg.cycle_coefficient for pg in self._qp_groups for q in pg.members}
-        # A direct mapping between queues and their bandwidth fraction Q.b
-        self._q_bf = {q: pg.bandwidth_fraction for pg in self._qp_groups for q in pg.members}
-        # A direct mapping between queues and their priority
-        self._q_pr = {q: pg.priority for pg in self._qp_groups for q in pg.members}
-
-    def _calc_arrival_pattern(self, cycle, flow):
-        """Overriding CSQF's original A(c)
-        """
-        return flow.size if (cycle * self._base_cycle % flow.period) == 0 else 0
+        # Queue attributes, indexed by queue
+        # Cycle coefficient Q.a
+        self._q_cf = np.zeros(self._queue_count, dtype=np.float64)
+        # Bandwidth fraction Q.b
+        self._q_bf = np.zeros(self._queue_count, dtype=np.float64)
+        # Priority
+        self._q_pr = np.zeros(self._queue_count, dtype=np.int64)
+
+        # Per priority group: member queues and link bandwidth allowance Qk.B
+        self._pg_queues = []
+        self._pg_bw = []
+
+        for pg in self._qp_groups:
+            _members = np.asarray(pg.members, dtype=np.intp)
+            self._pg_queues.append(_members)
+            self._pg_bw.append(pg.bandwidth_fraction * self._link_speed)
+
+            self._q_cf[_members] = pg.cycle_coefficient
+            self._q_bf[_members] = pg.bandwidth_fraction
+            self._q_pr[_members] = pg.priority
+
+        # Queue delay in cycles, T(rs) = rs.q x rs.Q.a
+        self._q_trs = np.arange(1, self._queue_count + 1) * self._q_cf
+
+    def _r_domain(self):
+        """Overriding r's domain, flows can only use queues of their own priority group.
+        r is fixed to 0 for every (flow, queue) of different priorities, on all links.
 
-    def _cons_priority_groups(self):
-        """Constrains flows according to their priority groups
-        Constrains flows by assigning them to queues with the same priority
-        group.
+        Returns:
+            Domain: domain of r[f, q, l]
         """
+        _shape = [self._flow_count, self._queue_count, self._link_count]
+        _allowed = (self._flow_prios[:, np.newaxis] == self._q_pr).astype(np.float64)
+        _ub = np.broadcast_to(_allowed[..., np.newaxis], _shape)
+
+        return Domain.integral(Domain.inRange(0.0, _ub.ravel(), _shape))
 
-        for m in self._flows:
-            _fp = m.priority
-
-            for _q in self._queue_iter:
-                _qp = self._q_pr[_q]
-                # Flow priority != queue priority = blocked from transmission in that queue
-                if _qp != _fp:
-                    self._model.constraint(
-                        f"Flow {m.uid} blocked in Queue {_q}",
-                        Expr.sum(
-                            self._r_vars.slice(
-                                [m.uid, _q, 0, 0],
-                                [m.uid + 1, _q + 1, self._device_count, self._device_count]
-                        )),
-                        Domain.equalsTo(0.0)
-                    )
+    def _arrival_patterns(self, cycles):
+        """Overriding CSQF's original A(c)
+        """
+        _offset = cycles[..., np.newaxis] * self._base_cycle % self._flow_periods
+        return np.where(_offset == 0, self._flow_sizes, 0.0)
 
     def _cons_deadline(self):
         """Constrains deadline
         """
 
-        for m in self._flow_iter:
-            _qs_vars = []
-            for q in self._queue_iter:
-                # queue coefficient delay
-                # from cycle domain to time domain
-                _qf = self._q_cf[q] * self._base_cycle
-                for d in self._dev_iter:
-                    _qs_vars.append(
-                        Expr.mul(
-                            _qf,
-                            self._r_vars.slice(
-                                [m, q, d, 0],
-                                [m + 1, q + 1, d + 1, self._device_count]
-                            )
-                        )
-                    )
+        # queue coefficient delay
+        # from cycle domain to time domain
+        _qf = np.repeat(self._q_cf * self._base_cycle, self._link_count)
 
-            self._model.constraint(
-                f"Flow {m} deadline",
-                Expr.sum(Expr.vstack(_qs_vars)),
-                Domain.lessThan(self._flow_dls[m])
-            )
+        # Right-hand side as a parameter, so batches can update it
+        self._dl_param = self._model.parameter("deadline", self._flow_count)
+        self._dl_param.setValue(self._flow_dls.astype(np.float64))
+
+        self._dl_cons = self._model.constraint(
+            "Flow deadline",
+            Expr.sub(self._r_flow_dots(_qf), self._dl_param),
+            Domain.lessThan(0.0)
+        )
+
+    def update_deadlines(self, flow_dls):
+        """Set new flow deadlines, keeping the model already built.
+        The deadline constraint, if posted, is updated as well.
+
+        Args:
+            flow_dls (np.ndarray): deadline of every flow, ordered by flow uid
+        """
+        self._flow_dls = np.asarray(flow_dls)
 
-    def _gen_constraints(self):
-        """Overriding, adding further constraints for MCQF
+        if self._dl_param is not None:
+            self._dl_param.setValue(self._flow_dls.astype(np.float64))
+
+    def solve_batch(self, flow_dls, verbose, write_tt, write_out):
+        """Solve the model for several sets of flow deadlines.
+        The deadline constraint is posted once, if missing, and only its
+        right-hand side changes between solves.
+        The constraint stays in the model: later solve() calls are also
+        deadline constrained, with the last deadlines of the batch.
+
+        Args:
+            flow_dls (list): deadlines of every instance, ordered by flow uid
+            verbose (bool): output solver details on console
+            write_tt (bool): write .PTF file
+            write_out (bool): write .CSV solution file
+
+        Returns:
+            list: the solution of every instance
         """
-        super()._gen_constraints()
+        if self._dl_cons is None:
+            self._cons_deadline()
+
+        solutions = []
+        for dls in flow_dls:
+            self.update_deadlines(dls)
+            solutions.append(self.solve(verbose, write_tt, write_out))
 
-        # MCQF exclusive constraints
-        self._cons_priority_groups()
+        return solutions
 
     def _cons_bandwidth(self):
         """Link bandwidth utilization
         """
+        # Arrival patterns do not depend on the edge, computed once for all queues
+        # alpha[c, f, q]: A(c - T(rs)) of flow f in queue q
+        _realc = np.arange(1, self._cycle_count + 1)
+        alpha = self._arrival_tensor(_realc[:, np.newaxis] - self._q_trs).transpose(0, 2, 1)
 
-        for d in self._dev_iter:
-            for e in self._dev_iter:
-                for pgroup in self._qp_groups:
-                    pty = pgroup.priority
-                    bw_f = pgroup.bandwidth_fraction
-                    cycle_coef = pgroup.cycle_coefficient
-                    queues = pgroup.members
-
-                    for c in self._cycle_iter:
-                        _realc = c + 1
-                        # flows in device e(d, e)
-                        _pgs_vars = []
-                        # Queues in this priority group
-                        for q in queues:
-                            _realq = q + 1
-                            t_rs = _realq * cycle_coef
-
-                            for f in self._flows:
-                                # Arrival pattern (A(c - T(rs)))
-                                _s_a = self._calc_arrival_pattern(_realc - t_rs, f)
-                                _s_var = self._r_vars.index([f.uid, q, d, e])
-                                _pgs_vars.append(Expr.mul(_s_a, _s_var))
-
-                        # Link utilization constraint
-                        # BUijkc <= Qk.B
-                        # Not greater than priority group's bandwidth allowance
-                        self._model.constraint(
-                            f"Link capacity edge {d}<->{e} cycle {_realc} - Piority {pty}",
-                            Expr.sum(Expr.vstack(_pgs_vars)),
-                            Domain.lessThan(bw_f * self._link_speed)
-                        )
+        _r_flat = Expr.flatten(self._r_vars)
+
+        for pgroup, queues, bw_rhs in zip(self._qp_groups, self._pg_queues, self._pg_bw):
+            # Link utilization constraint, for every link and cycle
+            # BUijkc <= Qk.B
+            # Not greater than priority group's bandwidth allowance
+            self._model.constraint(
+                f"Link capacity - Piority {pgroup.priority}",
+                Expr.mul(self._link_load_matrix(alpha[:, :, queues], queues), _r_flat),
+                Domain.lessThan(bw_rhs)
+            )
 
     def _obj_mean_e2e_delay(self):
         """Objective function minimizing E2E delay.
@@ -133,24 +165,14 @@ class MultiCqf(Csqf):
         Given by: 
             sum(rls.q x rls.Q.a), for i,j in |D| and s in |S|
         """
-        e2e = []
-        for q in self._queue_iter:
-            _realq = q + 1
-            _qf = self._q_cf[q]
-
-            e2e.append(
-                Expr.mul(
-                    _realq * _qf * self._base_cycle,
-                    self._r_vars.slice(
-                        [0, q, 0, 0],
-                        [self._flow_count, q + 1, self._device_count, self._device_count]
-                ))
-            )
+        # rls.q x rls.Q.a, for every r[f, q, l]
+        _qf = self._q_trs * self._base_cycle
+        _coef = np.tile(np.repeat(_qf, self._link_count), self._flow_count)
 
         # 1/|S| * sum(E2E(rij))
         return Expr.mul(
             1/self._flow_count,
-            Expr.sum(Expr.vstack(e2e))
+            Expr.dot(_coef, Expr.flatten(self._r_vars))
         )
 
     def _obj_bandwidth_util(self):
@@ -159,23 +181,11 @@ class MultiCqf(Csqf):
         Given by: 
             sum(Bijc) / |E|, for e,j in |D| and c in |C|
         """
-        obj_mband = []
-        for d in self._dev_iter:
-            for e in self._dev_iter:
-                _bmax_vars = self._b_vars.slice(
-                    [d, e],
-                    [d + 1, e + 1]
-                )
-                # Max(Bijc) / e.S
-                obj_mband.append(
-                    Expr.mul(
-                        1/self._link_speed,
-                        Expr.sum(_bmax_vars)
-                    )
-                )
+        # Max(Bijc) / e.S
+        obj_mband = Expr.mul(1/self._link_speed, Expr.sum(self._b_vars))
 
         # Omega = sum(BUij) / |Epsilon|
-        return Expr.mul(1/self._edge_count, Expr.sum(Expr.vstack(obj_mband)))
+        return Expr.mul(1/self._edge_count, obj_mband)
 
     def _build_obj_func(self, *args):
         """Build multi-objective function
@@ -201,21 +211,32 @@ class MultiCqf(Csqf):
         # 7-missed, 6-missed, 5-missed, 4-missed 
 
         # Report vars
-        # Stats for each priority group, in format (Mean E2E, MaxBW, MeanBW, Missed)
-        _dgroups = {pg.priority: [0, 0, 0, 0] for pg in sorted(self._qp_groups, key=lambda x: x.priority)}
-        
+        _g_count = len(self._pg_rows)
+        # Report row of every flow's group
+        # Flows without a configured group have no allowed queue, so they never reach a solution
+        _flow_rows = np.fromiter(
+            (self._pg_rows[f.priority] for f in self._flows), dtype=np.intp, count=self._flow_count
+        )
         # Amount of flows in each PG
-        _fgroups = {pg: 0 for pg in _dgroups}
-        for f in self._flows:
-            _fgroups[f.priority] += 1
-
-        # Dynamically building headers
-        _pg_mean_delay = ",".join(["{}-E2E".format(pg) for pg in _dgroups])
-        _pg_maxbwc = ",".join(["{}-MaxBWC".format(pg) for pg in _dgroups])
-        _pg_meanbwc = ",".join(["{}-MeanBWC".format(pg) for pg in _dgroups])
-        _pg_missed = ",".join(["{}-missed".format(pg) for pg in _dgroups])
-        mean_delay = 0
-        missed_dl = 0
+        _fgroups = np.bincount(_flow_rows, minlength=_g_count)
+
+        # MCQF != CSQF, as α = r.q x r.Q.α
+        # Recalculating delay, for all flows at once
+        _paths = [solution.flows[flow.name][3] for flow in self._flows]
+        _f_idx = np.repeat(np.arange(self._flow_count), [len(path) for path in _paths])
+        _q_idx = np.fromiter((p[3] for path in _paths for p in path), dtype=np.intp, count=len(_f_idx))
+        _delays = np.bincount(
+            _f_idx, weights=self._q_cf[_q_idx] * _q_idx * self._base_cycle, minlength=self._flow_count
+        )
+        _missed = _delays > self._flow_dls
+
+        # Stats for each priority group: Mean E2E, Missed
+        _pg_e2e = np.zeros(_g_count)
+        np.add.at(_pg_e2e, _flow_rows, _delays / _fgroups[_flow_rows])
+        _pg_missed = np.bincount(_flow_rows[_missed], minlength=_g_count)
+
+        mean_delay = float(_delays.sum())
+        missed_dl = int(_missed.sum())
         # BW
         mean_lu = 0
         max_lu = 0
@@ -225,26 +246,7 @@ class MultiCqf(Csqf):
         # File header
         # TCFileame-TrafficShaper-Algorithm-Topo.csv
         _report_f_name = f"{self._output_name}_report.csv"
-        _repor_out = f"\nTCFileName, TrafficShaper, Algorithm, Runtime(s), MeanE2E(us), {_pg_mean_delay}, MeanLU (%), MaxLU (%), MeanBWC(%), MaxBWC(%), {_pg_maxbwc}, {_pg_meanbwc}, NoofmissedDeadlines, {_pg_missed}\n"
-
-        for flow in self._flows:
-            f_path = solution.flows[flow.name][3]
-            # MCQF != CSQF, as α = r.q x r.Q.α
-            # Recalculating delay
-            delay = sum([self._q_cf[p[3]] * p[3] * self._base_cycle for p in f_path])
-            mean_delay += delay
-            _dgroups[flow.priority][0] += delay / _fgroups[flow.priority]  # Mean E2E
-            _dgroups[flow.priority][1] += 0                                # MeanBWC
-            _dgroups[flow.priority][2] += 0                                # MaxBWC
-            m_dl = 1 if delay > flow.deadline else 0
-            missed_dl += m_dl                                              # NoofmissedDeadlines
-            _dgroups[flow.priority][3] += m_dl                             # Missed Deadline
-
-        _repor_out += f"{self.name}, {self._traffic_type}, IP, {self.runtime[0]}, {mean_delay / self._flow_count}"
-
-        # MeanE2E
-        for _, data in _dgroups.items():
-            _repor_out += f", {data[0]}"
+        _report = [self._report_header]
 
         # LINKS
         for _, data in solution.edges.items():
@@ -255,22 +257,20 @@ class MultiCqf(Csqf):
             # MaxLU % - transforming from kbps to mbps
             max_lu += data[0] / 1000 / self._edge_count / 100
 
-        _repor_out += f", {mean_lu}, {max_lu}, {mean_bwc}, {max_bwc}"
-
-        # MaxBWC per group
-        for _, data in _dgroups.items():
-            _repor_out += f", {data[2]}"
-
-        # MeanBWC per group
-        for _, data in _dgroups.items():
-            _repor_out += f", {data[1]}"
-        
-        # Noofmisseddeadlines
-        _repor_out += f", {missed_dl}"
-
-        # Missed deadlines per group
-        for _, data in _dgroups.items():
-            _repor_out += f", {data[3]}"
+        # Per group columns, groups without flows report 0
+        _e2e_cols = [e2e if n else 0 for e2e, n in zip(_pg_e2e.tolist(), _fgroups)]
+        _bwc_cols = [0] * _g_count
+
+        _report.append(", ".join(map(str, [
+            self.name, self._traffic_type, "IP", self.runtime[0], mean_delay / self._flow_count,
+            *_e2e_cols,                                     # MeanE2E
+            mean_lu, max_lu, mean_bwc, max_bwc,
+            *_bwc_cols,                                     # MaxBWC per group
+            *_bwc_cols,                                     # MeanBWC per group
+            missed_dl,                                      # Noofmisseddeadlines
+            *_pg_missed.tolist()                            # Missed deadlines per group
+        ])))
+        _repor_out = "".join(_report)
 
         # Result to stdout
         print(_repor_out)
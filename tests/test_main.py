@@ -14,4 +14,4 @@ class TestMain:
         with pytest.raises(SystemExit) as e:
             main(mcqf_main_args)
 
-        assert e.type == SystemExit
\ No newline at end of file
+        assert e.type == SystemExit
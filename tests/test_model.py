@@ -81,3 +81,33 @@ class TestMcqf:
         solution = msk.solve(*generic_solver_args)
         edgs = solution.edges
         assert abs(edgs['e1'][2] - 29) < .6
+
+    def test_mcqf_solve_batch(self, generic_solver_args, switch_mcqf_config, topo_1sw):
+        """The model is built once and re-solved for every set of deadlines.
+        """
+        raw_flows = io_wrapper(StringIO("FLOW,7,0,VLAN_0_Flow_0,ISOCHRONOUS_REAL_TIME,node0_0_0_0,node0_0_0_1,NO,50,MICRO_SECOND,50,MICRO_SECOND,135"))
+        flows = parse_flows(raw_flows)
+        topology = parse_topo(topo_1sw)
+        network = Network(topology=topology, flows=flows, switch_conf=switch_mcqf_config)
+        msk = MultiCqf("test_mcqf", network)
+        solutions = msk.solve_batch([[50], [100]], *generic_solver_args)
+
+        assert len(solutions) == 2
+        assert [s.flows['VLAN_0_Flow_0'][1] for s in solutions] == [50, 100]
+
+        # Two hops take at least 24 us, a 10 us deadline is infeasible
+        with pytest.raises(SolutionError) as e:
+            msk.solve_batch([[10]], *generic_solver_args)
+
+    def test_mcqf_solve_batch_after_solve(self, generic_solver_args, switch_mcqf_config, topo_1sw):
+        """The deadline constraint is posted on a model that was already solved.
+        """
+        raw_flows = io_wrapper(StringIO("FLOW,7,0,VLAN_0_Flow_0,ISOCHRONOUS_REAL_TIME,node0_0_0_0,node0_0_0_1,NO,50,MICRO_SECOND,50,MICRO_SECOND,135"))
+        flows = parse_flows(raw_flows)
+        topology = parse_topo(topo_1sw)
+        network = Network(topology=topology, flows=flows, switch_conf=switch_mcqf_config)
+        msk = MultiCqf("test_mcqf", network)
+        msk.solve(*generic_solver_args)
+
+        with pytest.raises(SolutionError) as e:
+            msk.solve_batch([[10]], *generic_solver_args)
@@ -1,8 +1,11 @@
+import copy
+import pickle
 from main import main
 from bin.io.topo import (
     parse_flows,
     parse_switch_conf,
-    parse_topo
+    parse_topo,
+    read_file
 )
 
 
@@ -11,8 +14,57 @@ class TestParser:
     def test_switch_conf_init(self, sw_config):
         assert parse_switch_conf(sw_config)
 
+    def test_switch_conf_groups_copy(self, sw_config):
+        groups = parse_switch_conf(sw_config)['groups']
+
+        assert pickle.loads(pickle.dumps(groups)) == groups
+        assert copy.copy(groups[0]) == groups[0]
+
     def test_topo_parser_init(self, topo_4sw):
         assert parse_topo(topo_4sw)
 
+    def test_topo_parser_ports(self):
+        topology = parse_topo((
+            "vertex,PLC,node0_0_0_0,mac,00:00:00:00:00:08,PortNumber,1",
+            "vertex,SWITCH,sw_0_0,mac,00:00:00:00:00:00,PortNumber,8",
+            "edge,WIRE,node0_0_0_0,sw_0_0.P3,undirect,e1"
+        ))
+        edge, = topology['edges']
+
+        assert (edge.source.name, edge.destination.name, edge.port) == ("node0_0_0_0", "sw_0_0", 3)
+
     def test_flow_parser_init(self, flow_1):
         assert parse_flows(flow_1)
+
+    def test_flow_parser_fields(self):
+        raw_flows = tuple(
+            f"FLOW,{4 + n % 4},{n},VLAN_0_Flow_{n},ISOCHRONOUS_REAL_TIME,node0_0_0_0,node0_0_0_1,NO,50,MICRO_SECOND,{n},MICRO_SECOND,300"
+            for n in range(20)
+        )
+        flows = {f.uid: f for f in parse_flows(raw_flows)}
+
+        assert len(flows) == 20
+        _f = flows[13]
+        assert (_f.name, _f.source, _f.destination) == ("VLAN_0_Flow_13", "node0_0_0_0", "node0_0_0_1")
+        assert (_f.priority, _f.size_bits, _f.period, _f.deadline) == (5, 2400, 50, 13)
+
+    def test_flow_parser_hash_names(self):
+        raw_flows = tuple(
+            f"FLOW,7,{n},Flow#{n},ISOCHRONOUS_REAL_TIME,node0_0_0_0,node0_0_0_1,NO,50,MICRO_SECOND,50,MICRO_SECOND,300"
+            for n in range(20)
+        )
+        flows = {f.uid: f for f in parse_flows(raw_flows)}
+
+        assert len(flows) == 20
+        assert flows[13].name == "Flow#13"
+
+    def test_read_file_cache(self, tmp_path):
+        _fp = tmp_path / "config.csv"
+        _fp.write_text("# priority, amount of queues, bandwidth factor, delay coefficient\n7,1,0.3,1")
+
+        assert read_file(str(_fp)) == ("7,1,0.3,1",)
+        assert read_file(str(_fp)) is read_file(str(_fp))
+
+        # Changed files are read again
+        _fp.write_text("7,1,0.3,1\r\n\n6,2,0.25,4\n")
+        assert read_file(str(_fp)) == ("7,1,0.3,1", "6,2,0.25,4")